@@ -3,20 +3,19 @@ import pandas as pd
 import numpy as np
 import os
 import pickle
-from PIL import Image
-import base64
-import requests
-from io import BytesIO
-import json
+import html
+import re
+from concurrent.futures import ThreadPoolExecutor
 
 # Import custom modules
 from src.data_processor import DataProcessor
-from src.recommender import MovieRecommender
+from src.recommender import MovieRecommender, top_n
 from src.utils import (
     get_poster_url, get_poster_image, format_genres, 
     create_star_rating, create_movie_card, export_recommendations,
     setup_session_state, track_movie_view, track_recommendation_click,
-    get_theme_config, get_movie_backdrop
+    get_theme_config, get_movie_backdrop, parse_genre_names,
+    prefetch_images, download_file, get_tmdb_api_key, map_with_script_run_ctx
 )
 
 # Set page configuration
@@ -72,27 +71,14 @@ def local_css():
 local_css()
 
 # Helper functions for app pages
-@st.cache_data(ttl=3600)
-def get_background_image(url):
-    """Get background image and cache it"""
-    response = requests.get(url)
-    img = Image.open(BytesIO(response.content))
-    
-    # Convert to base64
-    buffered = BytesIO()
-    img.save(buffered, format="JPEG", quality=50)
-    img_str = base64.b64encode(buffered.getvalue()).decode()
-    return img_str
-
 def add_bg_from_url(url):
     """Add background image from URL"""
-    img_str = get_background_image(url)
-    
+    # Referencing the URL lets the browser fetch and cache the image itself
     st.markdown(
         f"""
         <style>
         .stApp {{
-            background-image: url(data:image/jpeg;base64,{img_str});
+            background-image: url('{url}');
             background-size: cover;
             background-position: center;
             background-repeat: no-repeat;
@@ -112,98 +98,195 @@ def add_bg_from_url(url):
         unsafe_allow_html=True
     )
 
-def load_data():
-    """Load or download dataset"""
-    data_path = "data/movies_metadata.csv"
-    processed_path = "data/processed_data.pkl"
-    
-    @st.cache_data(ttl=86400, show_spinner="Loading movie data...")
-    def get_data():
-        try:
-            # First try to load processed data
-            if os.path.exists(processed_path):
-                try:
-                    processor = DataProcessor()
-                    data = processor.load_processed_data(processed_path)
-                    st.success("Successfully loaded processed movie data")
-                    return data['movies_df'], data['tfidf_matrix']
-                except Exception as e:
-                    st.warning(f"Error loading processed data: {e}. Trying raw data...")
-            
-            # If processed data fails, try raw data
-            if os.path.exists(data_path):
-                try:
-                    # Process the data
-                    processor = DataProcessor(data_path)
-                    movies_df = processor.load_data()
-                    movies_df = processor.preprocess_data()
-                    similarity_matrix = processor.compute_similarity_matrix()
-                    
-                    # Save processed data
-                    processor.save_processed_data(processed_path)
-                    st.success("Successfully processed and saved movie data")
-                    return movies_df, similarity_matrix
-                except Exception as e:
-                    st.warning(f"Error processing data: {e}. Downloading sample data...")
-            
-            # If no data available, download sample data
-            st.info("Downloading sample TMDB dataset...")
-            
-            # Create data directory if it doesn't exist
-            os.makedirs(os.path.dirname(data_path), exist_ok=True)
-            
-            # Use TMDB 5000 sample (smaller dataset)
-            url = "https://raw.githubusercontent.com/Kamal2511/Movie-Recommender-System/main/tmdb_5000_movies.csv"
+def read_data(data_path, processed_path):
+    """Load processed data, process the raw CSV, or download the sample dataset"""
+    try:
+        # First try to load processed data
+        if os.path.exists(processed_path):
+            try:
+                processor = DataProcessor()
+                data = processor.load_processed_data(processed_path)
+                st.success("Successfully loaded processed movie data")
+                return data['movies_df'], data['tfidf_matrix']
+            except Exception as e:
+                st.warning(f"Error loading processed data: {e}. Trying raw data...")
+        
+        # If processed data fails, try raw data
+        if os.path.exists(data_path):
             try:
-                # Download and save
-                df = pd.read_csv(url)
-                df.to_csv(data_path, index=False)
-                
                 # Process the data
                 processor = DataProcessor(data_path)
                 movies_df = processor.load_data()
                 movies_df = processor.preprocess_data()
-                similarity_matrix = processor.compute_similarity_matrix()
+                feature_matrix = processor.compute_feature_matrix()
                 
                 # Save processed data
                 processor.save_processed_data(processed_path)
-                
-                st.success("Successfully downloaded and processed movie data")
-                return movies_df, similarity_matrix
+                st.success("Successfully processed and saved movie data")
+                return movies_df, feature_matrix
             except Exception as e:
-                st.error(f"Error downloading and processing data: {e}")
-                # Return empty dataframe and None similarity matrix as fallback
-                # This will allow the app to initialize and show an error message
-                empty_df = pd.DataFrame(columns=['id', 'title', 'overview', 'genres', 'year', 'vote_average', 'popularity'])
-                return empty_df, None
+                st.warning(f"Error processing data: {e}. Downloading sample data...")
+        
+        # If no data available, download sample data
+        st.info("Downloading sample TMDB dataset...")
+        
+        # Create data directory if it doesn't exist
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        
+        # Use TMDB 5000 sample (smaller dataset)
+        url = "https://raw.githubusercontent.com/Kamal2511/Movie-Recommender-System/main/tmdb_5000_movies.csv"
+        try:
+            # Save the raw CSV straight to disk so later starts read it locally
+            download_file(url, data_path)
+            
+            # Process the data
+            processor = DataProcessor(data_path)
+            movies_df = processor.load_data()
+            movies_df = processor.preprocess_data()
+            feature_matrix = processor.compute_feature_matrix()
+            
+            # Save processed data
+            processor.save_processed_data(processed_path)
+            
+            st.success("Successfully downloaded and processed movie data")
+            return movies_df, feature_matrix
         except Exception as e:
-            st.error(f"Unexpected error during data loading: {e}")
+            st.error(f"Error downloading and processing data: {e}")
+            # Return empty dataframe and None similarity matrix as fallback
+            # This will allow the app to initialize and show an error message
             empty_df = pd.DataFrame(columns=['id', 'title', 'overview', 'genres', 'year', 'vote_average', 'popularity'])
             return empty_df, None
+    except Exception as e:
+        st.error(f"Unexpected error during data loading: {e}")
+        empty_df = pd.DataFrame(columns=['id', 'title', 'overview', 'genres', 'year', 'vote_average', 'popularity'])
+        return empty_df, None
+
+# Cached as a resource so reruns share the loaded objects instead of unpickling a copy.
+# The dataframe, feature matrix and search index must be treated as read-only.
+@st.cache_resource(ttl=86400, show_spinner="Loading movie data...")
+def load_data(data_path="data/movies_metadata.csv", processed_path="data/processed_data.pkl"):
+    """Load or download dataset"""
+    movies_df, feature_matrix = read_data(data_path, processed_path)
+    return movies_df, feature_matrix, build_search_index(movies_df)
+
+def build_text_buffer(values):
+    """Join lowercase values into one newline-separated buffer with the start offset of each line"""
+    lines = values.fillna('').astype(str).str.lower().str.replace('\n', ' ', regex=False).tolist()
+    line_starts = np.zeros(len(lines), dtype=np.int64)
+    if lines:
+        np.cumsum([len(line) + 1 for line in lines[:-1]], out=line_starts[1:])
+    return '\n'.join(lines), line_starts
+
+def search_text_buffer(text_buffer, query):
+    """Get a row mask of the lines in a text buffer that contain the query"""
+    text, line_starts = text_buffer
+    mask = np.zeros(len(line_starts), dtype=bool)
+    pattern = re.compile(re.escape(query.lower().replace('\n', ' ')))
+    # One scan over the whole buffer, then map match positions back to rows
+    positions = [match.start() for match in pattern.finditer(text)]
+    if positions:
+        mask[np.searchsorted(line_starts, positions, side='right') - 1] = True
+    return mask
+
+def build_search_index(movies_df):
+    """Build lowercase text buffers and compact numeric arrays used by the search filters"""
+    search_index = {
+        'title': build_text_buffer(movies_df['title'])
+    }
+    
+    # Parsed genre names, from the preprocessed column when the data has one
+    if 'genre_names' in movies_df.columns:
+        search_index['genre_names'] = [list(names) for names in movies_df['genre_names']]
+    elif 'genres' in movies_df.columns:
+        search_index['genre_names'] = movies_df['genres'].map(parse_genre_names).tolist()
+    
+    # One packed row bitmap per genre, so a genre filter is a single unpack
+    if 'genre_names' in search_index:
+        genre_rows = {}
+        for i, names in enumerate(search_index['genre_names']):
+            for g in names:
+                genre_rows.setdefault(g, []).append(i)
+        
+        search_index['genre_masks'] = {}
+        for g, rows in genre_rows.items():
+            mask = np.zeros(len(movies_df), dtype=bool)
+            mask[rows] = True
+            search_index['genre_masks'][g] = np.packbits(mask)
+        search_index['unique_genres'] = sorted(genre_rows)
+    
+    # Missing years become 0 so they fall outside any year range, like NaN did before
+    if 'year' in movies_df.columns:
+        search_index['year'] = movies_df['year'].fillna(0).to_numpy(dtype=np.int32)
+    
+    if 'vote_average' in movies_df.columns:
+        search_index['vote_average'] = movies_df['vote_average'].to_numpy(dtype=np.float32)
     
-    return get_data()
+    return search_index
 
-# Eager loading of background image
-bg_url = "https://wallpaperaccess.com/full/3658597.jpg"
-try:
-    get_background_image(bg_url)
-except:
-    pass
+def get_movie_poster_url(movie, api_key=None):
+    """Get the poster URL for a movie from its precomputed URL, poster path or the TMDB API"""
+    if 'poster_url' in movie and isinstance(movie['poster_url'], str) and movie['poster_url']:
+        return movie['poster_url']
+    elif 'poster_path' in movie and pd.notna(movie['poster_path']) and movie['poster_path']:
+        return f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
+    elif 'id' in movie:
+        return get_poster_url(movie['id'], api_key=api_key)
+    return None
+
+def get_star_rating(movie):
+    """Get the star rating markup for a movie, preferring the precomputed column"""
+    if 'stars_html' in movie and isinstance(movie['stars_html'], str):
+        return movie['stars_html']
+    return create_star_rating(movie['vote_average'])
+
+def add_poster_urls(*sections):
+    """Return copies of the movie frames with poster URLs resolved concurrently into a poster_url column"""
+    # Resolve every section's posters in one pool so all the lookups overlap
+    rows = [movie for movies in sections for movie in movies.to_dict('records')]
+    
+    # Read the API key here so the workers never touch st.secrets; they share this
+    # run's script context for the cached TMDB lookups
+    api_key = get_tmdb_api_key()
+    poster_urls = map_with_script_run_ctx(
+        lambda movie: get_movie_poster_url(movie, api_key=api_key), rows, max_workers=8
+    )
+    
+    results = []
+    start = 0
+    for movies in sections:
+        movies = movies.copy()
+        movies['poster_url'] = poster_urls[start:start + len(movies)]
+        start += len(movies)
+        results.append(movies)
+    return results
+
+def get_data_version(movies_df):
+    """Get a cheap fingerprint of the movie data used to invalidate cached results"""
+    if len(movies_df) == 0:
+        return 0
+    return hash((len(movies_df), movies_df['title'].iloc[0], movies_df['title'].iloc[-1]))
 
 # Load data with a progress indicator
 with st.spinner("Loading movie recommendation system..."):
-    movies_df, similarity_matrix = load_data()
+    movies_df, feature_matrix, search_index = load_data()
 
 # Check if data was loaded successfully
 if movies_df is None or len(movies_df) == 0:
     st.error("Failed to load movie data. Please try refreshing the page or contact support.")
     # Initialize with empty data to avoid errors
     movies_df = pd.DataFrame(columns=['id', 'title', 'overview', 'genres', 'year', 'vote_average', 'popularity'])
-    similarity_matrix = None
+    feature_matrix = None
+    search_index = build_search_index(movies_df)
+
+data_version = get_data_version(movies_df)
+
+# Initialize recommender system once per data version; it is shared across reruns and sessions
+@st.cache_resource(show_spinner=False)
+def build_recommender(_movies_df, _feature_matrix, data_version):
+    """Build the recommender and its lookup indices"""
+    return MovieRecommender(_movies_df, _feature_matrix)
 
-# Initialize recommender system
-recommender = MovieRecommender()
-recommender.set_data(movies_df, similarity_matrix)
+recommender = build_recommender(movies_df, feature_matrix, data_version)
 
 # Direct download of the data on app startup
 if movies_df is None or len(movies_df) == 0:
@@ -211,11 +294,112 @@ if movies_df is None or len(movies_df) == 0:
     try:
         import download_sample_data
         download_sample_data.download_sample_data()
-        st.experimental_rerun()
+        load_data.clear()
+        st.rerun()
     except Exception as e:
         st.error(f"Failed to download data: {e}")
 
+# Button callbacks update session state before the rerun the click triggers
+def select_movie(movie, recommendation_type=None):
+    """Open the details page for a movie"""
+    st.session_state.selected_movie = movie
+    st.session_state.page = 'movie_details'
+    if recommendation_type is not None:
+        track_recommendation_click(movie['id'], recommendation_type)
+
+def go_to_page(page):
+    """Switch to another page"""
+    st.session_state.page = page
+
+def add_favorite_movie(title):
+    """Add a movie title to the user's favorites"""
+    if title in st.session_state.favorite_movies:
+        st.session_state.movie_notice = ('warning', f"'{title}' is already in your favorites")
+    else:
+        st.session_state.favorite_movies.append(title)
+        st.session_state.movie_notice = ('success', f"Added '{title}' to your favorites")
+
+def remove_favorite_movie(title):
+    """Remove a movie title from the user's favorites"""
+    if title in st.session_state.favorite_movies:
+        st.session_state.favorite_movies.remove(title)
+        st.session_state.movie_notice = ('success', f"Removed '{title}' from your favorites")
+
+def add_favorite_genre(genre):
+    """Add a genre to the user's favorite genres"""
+    if genre in st.session_state.favorite_genres:
+        st.session_state.genre_notice = ('warning', f"'{genre}' is already in your favorite genres")
+    else:
+        st.session_state.favorite_genres.append(genre)
+        st.session_state.genre_notice = ('success', f"Added '{genre}' to your favorite genres")
+
+def remove_favorite_genre(genre):
+    """Remove a genre from the user's favorite genres"""
+    if genre in st.session_state.favorite_genres:
+        st.session_state.favorite_genres.remove(genre)
+
+def show_notice(key):
+    """Show the message a callback left under key in session state, if any"""
+    notice = st.session_state.pop(key, None)
+    if notice is not None:
+        level, message = notice
+        getattr(st, level)(message)
+
+def select_movie_from_grid(movies, key):
+    """Open the details page for the movie picked in a grid's selector"""
+    position = st.session_state[key]
+    if position is not None:
+        select_movie(movies.iloc[position].to_dict())
+        # Reset the selector so picking the same movie again still fires
+        st.session_state[key] = None
+
+def render_movie_grid(movies, key, show_rating=False, show_year=False):
+    """Render movie cards as a single HTML block with one selector for opening details"""
+    cards = []
+    for movie in movies.to_dict('records'):
+        card = '<div class="movie-card">'
+        poster_url = movie.get('poster_url')
+        if isinstance(poster_url, str) and poster_url:
+            card += f'<img class="card-img" src="{html.escape(poster_url)}">'
+        card += f'<div class="card-title">{html.escape(str(movie["title"]))}</div>'
+        if show_rating and 'vote_average' in movie:
+            card += f"<div class='rating'>{get_star_rating(movie)}</div>"
+        if show_year and 'year' in movie and not pd.isna(movie['year']):
+            card += f"<div><b>Year:</b> {int(movie['year'])}</div>"
+        cards.append(card + '</div>')
+    
+    st.markdown(f'<div class="movie-grid">{"".join(cards)}</div>', unsafe_allow_html=True)
+    
+    # A single selector replaces one "More about" button per card
+    titles = movies['title'].tolist()
+    st.selectbox(
+        "More about:",
+        range(len(titles)),
+        index=None,
+        format_func=lambda position: titles[position],
+        placeholder="Select a movie to see its details",
+        key=key,
+        on_change=select_movie_from_grid,
+        args=(movies, key)
+    )
+
+# Home page sections are cached so reruns skip the ranking work and poster lookups.
+# The recommender isn't hashed; data_version invalidates the cache when the data changes.
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_home_sections(_recommender, data_version, n=6):
+    """Get the trending, latest and top rated movies for the home page"""
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(_recommender.get_popularity_based_recommendations, n=n),
+            executor.submit(_recommender.get_recent_recommendations, n=n),
+            executor.submit(top_n, _recommender.movies_df, 'vote_average', n)
+        ]
+        sections = [future.result() for future in futures]
+    
+    return add_poster_urls(*sections)
+
 # Home page
+@st.fragment
 def show_home_page():
     st.title("🎬 Welcome to Movie Recommender")
     st.write("Discover movies you'll love based on your preferences!")
@@ -231,118 +415,31 @@ def show_home_page():
                     import download_sample_data
                     download_sample_data.download_sample_data()
                     st.success("Sample data downloaded successfully!")
-                    st.experimental_rerun()
+                    load_data.clear()
+                    st.rerun()
                 except Exception as e:
                     st.error(f"Error downloading sample data: {e}")
         return
     
-    # Featured movies (top trending)
-    st.header("📈 Trending Movies")
-    with st.spinner("Loading trending movies..."):
+    with st.spinner("Loading movies..."):
         try:
-            trending_movies = recommender.get_popularity_based_recommendations(n=6)
-            
-            # Display in a grid
-            cols = st.columns(3)
-            for i, (_, movie) in enumerate(trending_movies.iterrows()):
-                with cols[i % 3]:
-                    st.markdown(f"""
-                    <div class="movie-card">
-                        <h3>{movie['title']}</h3>
-                    """, unsafe_allow_html=True)
-                    
-                    # Show poster if available
-                    if 'poster_path' in movie and movie['poster_path']:
-                        poster_url = f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
-                        st.image(poster_url, use_column_width=True)
-                    elif 'id' in movie:
-                        poster_url = get_poster_url(movie['id'])
-                        if poster_url:
-                            st.image(poster_url, use_column_width=True)
-                    
-                    # Add rating
-                    if 'vote_average' in movie:
-                        st.markdown(f"<div class='rating'>{create_star_rating(movie['vote_average'])}</div>", unsafe_allow_html=True)
-                    
-                    # Add button to movie details
-                    if st.button(f"More about {movie['title']}", key=f"trending_{movie['id']}"):
-                        st.session_state.selected_movie = movie
-                        st.session_state.page = 'movie_details'
-                        st.experimental_rerun()
+            trending_movies, recent_movies, top_rated = get_home_sections(recommender, data_version, n=6)
         except Exception as e:
-            st.error(f"Error loading trending movies: {e}")
+            st.error(f"Error loading movies: {e}")
+            trending_movies = recent_movies = top_rated = None
     
-    # Recently released movies
-    st.header("🆕 Latest Releases")
-    with st.spinner("Loading latest releases..."):
-        try:
-            recent_movies = recommender.get_recent_recommendations(n=6)
-            
-            # Display in a grid
-            cols = st.columns(3)
-            for i, (_, movie) in enumerate(recent_movies.iterrows()):
-                with cols[i % 3]:
-                    st.markdown(f"""
-                    <div class="movie-card">
-                        <h3>{movie['title']}</h3>
-                    """, unsafe_allow_html=True)
-                    
-                    # Show poster if available
-                    if 'poster_path' in movie and movie['poster_path']:
-                        poster_url = f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
-                        st.image(poster_url, use_column_width=True)
-                    elif 'id' in movie:
-                        poster_url = get_poster_url(movie['id'])
-                        if poster_url:
-                            st.image(poster_url, use_column_width=True)
-                    
-                    # Add year
-                    if 'year' in movie and not pd.isna(movie['year']):
-                        st.write(f"**Year:** {int(movie['year'])}")
-                    
-                    # Add button to movie details
-                    if st.button(f"More about {movie['title']}", key=f"recent_{movie['id']}"):
-                        st.session_state.selected_movie = movie
-                        st.session_state.page = 'movie_details'
-                        st.experimental_rerun()
-        except Exception as e:
-            st.error(f"Error loading recent movies: {e}")
-    
-    # Top rated movies
-    st.header("⭐ Top Rated Movies")
-    with st.spinner("Loading top rated movies..."):
-        try:
-            top_rated = recommender.movies_df.sort_values('vote_average', ascending=False).head(6)
-            
-            # Display in a grid
-            cols = st.columns(3)
-            for i, (_, movie) in enumerate(top_rated.iterrows()):
-                with cols[i % 3]:
-                    st.markdown(f"""
-                    <div class="movie-card">
-                        <h3>{movie['title']}</h3>
-                    """, unsafe_allow_html=True)
-                    
-                    # Show poster if available
-                    if 'poster_path' in movie and movie['poster_path']:
-                        poster_url = f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
-                        st.image(poster_url, use_column_width=True)
-                    elif 'id' in movie:
-                        poster_url = get_poster_url(movie['id'])
-                        if poster_url:
-                            st.image(poster_url, width=300)
-                    
-                    # Add rating
-                    if 'vote_average' in movie:
-                        st.markdown(f"<div class='rating'>{create_star_rating(movie['vote_average'])}</div>", unsafe_allow_html=True)
-                    
-                    # Add button to movie details
-                    if st.button(f"More about {movie['title']}", key=f"toprated_{movie['id']}"):
-                        st.session_state.selected_movie = movie
-                        st.session_state.page = 'movie_details'
-                        st.experimental_rerun()
-        except Exception as e:
-            st.error(f"Error loading top rated movies: {e}")
+    if trending_movies is not None:
+        # Featured movies (top trending)
+        st.header("📈 Trending Movies")
+        render_movie_grid(trending_movies, key="trending_select", show_rating=True)
+        
+        # Recently released movies
+        st.header("🆕 Latest Releases")
+        render_movie_grid(recent_movies, key="recent_select", show_year=True)
+        
+        # Top rated movies
+        st.header("⭐ Top Rated Movies")
+        render_movie_grid(top_rated, key="toprated_select", show_rating=True)
     
     # Quick access to other pages
     st.markdown("---")
@@ -350,29 +447,26 @@ def show_home_page():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.button("🔍 Search Movies"):
-            st.session_state.page = 'search'
-            st.experimental_rerun()
+        st.button("🔍 Search Movies", on_click=go_to_page, args=('search',))
     
     with col2:
-        if st.button("🧠 Get Recommendations"):
-            st.session_state.page = 'recommendations'
-            st.experimental_rerun()
+        st.button("🧠 Get Recommendations", on_click=go_to_page, args=('recommendations',))
     
     with col3:
-        if st.button("⚙️ Set Preferences"):
-            st.session_state.page = 'preferences'
-            st.experimental_rerun()
+        st.button("⚙️ Set Preferences", on_click=go_to_page, args=('preferences',))
 
 # Search page
+@st.fragment
 def show_search_page():
     st.title("🔍 Search Movies")
     
     # Check if data is available
     if movies_df is None or len(movies_df) == 0:
         st.error("Movie data is not available. Please try reloading the page.")
+        # The data is loaded at module level, so retrying needs a full app rerun
         if st.button("Retry Loading Data"):
-            st.experimental_rerun()
+            load_data.clear()
+            st.rerun()
         return
     
     # Search by title
@@ -383,19 +477,7 @@ def show_search_page():
     
     with col1:
         # Get all unique genres
-        all_genres = []
-        if movies_df is not None and 'genres' in movies_df.columns:
-            for genre_list in movies_df['genres'].dropna():
-                try:
-                    genres = json.loads(genre_list.replace("'", "\""))
-                    if isinstance(genres, list):
-                        all_genres.extend([g['name'] for g in genres if 'name' in g])
-                except:
-                    # If not JSON format, try simple string splitting
-                    if isinstance(genre_list, str):
-                        all_genres.extend([g.strip() for g in genre_list.split(',')])
-        
-        unique_genres = sorted(list(set(all_genres)))
+        unique_genres = search_index.get('unique_genres', [])
         selected_genre = st.selectbox("Filter by Genre:", ["All Genres"] + unique_genres)
     
     with col2:
@@ -414,25 +496,31 @@ def show_search_page():
     # Apply search and filters
     if st.button("Search") or search_query:
         with st.spinner("Searching movies..."):
-            # Start with title search
-            if search_query and movies_df is not None:
-                results = movies_df[movies_df['title'].str.contains(search_query, case=False, na=False)]
-            elif movies_df is not None:
-                results = movies_df.copy()
-            else:
-                results = pd.DataFrame()
+            # Build a single boolean mask over the precomputed search arrays
+            mask = np.ones(len(movies_df), dtype=bool)
+            
+            # Apply title search
+            if search_query:
+                mask &= search_text_buffer(search_index['title'], search_query)
             
             # Apply genre filter
-            if selected_genre != "All Genres" and 'genres' in results.columns:
-                results = results[results['genres'].str.contains(selected_genre, case=False, na=False)]
+            if selected_genre != "All Genres" and 'genre_masks' in search_index:
+                genre_mask = search_index['genre_masks'].get(selected_genre)
+                if genre_mask is None:
+                    mask[:] = False
+                else:
+                    mask &= np.unpackbits(genre_mask, count=len(mask)).view(bool)
             
             # Apply year filter
-            if 'year' in results.columns:
-                results = results[(results['year'] >= year_range[0]) & (results['year'] <= year_range[1])]
+            if 'year' in search_index:
+                years = search_index['year']
+                mask &= (years >= year_range[0]) & (years <= year_range[1])
             
             # Apply rating filter
-            if min_rating > 0 and 'vote_average' in results.columns:
-                results = results[results['vote_average'] >= min_rating]
+            if min_rating > 0 and 'vote_average' in search_index:
+                mask &= search_index['vote_average'] >= min_rating
+            
+            results = movies_df.iloc[mask]
             
             # Display results
             if len(results) > 0:
@@ -440,19 +528,15 @@ def show_search_page():
                 
                 # Display in a scrollable container
                 with st.container():
-                    for i, (_, movie) in enumerate(results.iterrows()):
+                    for i, movie in enumerate(results.to_dict('records')):
                         st.markdown("---")
                         col1, col2 = st.columns([1, 3])
                         
                         with col1:
                             # Show poster if available
-                            if 'poster_path' in movie and movie['poster_path']:
-                                poster_url = f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
+                            poster_url = get_movie_poster_url(movie)
+                            if poster_url:
                                 st.image(poster_url, width=200)
-                            elif 'id' in movie:
-                                poster_url = get_poster_url(movie['id'])
-                                if poster_url:
-                                    st.image(poster_url, width=200)
                         
                         with col2:
                             st.subheader(movie['title'])
@@ -467,21 +551,19 @@ def show_search_page():
                             
                             # Show rating
                             if 'vote_average' in movie and not pd.isna(movie['vote_average']):
-                                st.markdown(f"<div class='rating'>{create_star_rating(movie['vote_average'])}</div>", unsafe_allow_html=True)
+                                st.markdown(f"<div class='rating'>{get_star_rating(movie)}</div>", unsafe_allow_html=True)
                             
                             # Show overview
                             if 'overview' in movie and not pd.isna(movie['overview']):
                                 st.write(movie['overview'][:200] + "..." if len(movie['overview']) > 200 else movie['overview'])
                             
                             # Add button to movie details
-                            if st.button(f"More about {movie['title']}", key=f"search_{movie['id']}"):
-                                st.session_state.selected_movie = movie
-                                st.session_state.page = 'movie_details'
-                                st.experimental_rerun()
+                            st.button(f"More about {movie['title']}", key=f"search_{movie['id']}", on_click=select_movie, args=(movie,))
             else:
                 st.warning("No movies found matching your criteria. Try adjusting your search.")
 
 # Recommendations page
+@st.fragment
 def show_recommendations_page():
     st.title("🧠 Get Movie Recommendations")
     
@@ -533,19 +615,15 @@ def show_recommendations_page():
                         st.success(f"Found {len(recommendations)} movies you might like!")
                         
                         # Display in a grid
-                        for i, (_, movie) in enumerate(recommendations.iterrows()):
+                        for i, movie in enumerate(recommendations.to_dict('records')):
                             st.markdown("---")
                             col1, col2 = st.columns([1, 3])
                             
                             with col1:
                                 # Show poster
-                                if 'poster_path' in movie and movie['poster_path']:
-                                    poster_url = f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
+                                poster_url = get_movie_poster_url(movie)
+                                if poster_url:
                                     st.image(poster_url, width=200)
-                                elif 'id' in movie:
-                                    poster_url = get_poster_url(movie['id'])
-                                    if poster_url:
-                                        st.image(poster_url, width=200)
                             
                             with col2:
                                 st.subheader(movie['title'])
@@ -566,18 +644,14 @@ def show_recommendations_page():
                                 
                                 # Show rating
                                 if 'vote_average' in movie and not pd.isna(movie['vote_average']):
-                                    st.markdown(f"<div class='rating'>{create_star_rating(movie['vote_average'])}</div>", unsafe_allow_html=True)
+                                    st.markdown(f"<div class='rating'>{get_star_rating(movie)}</div>", unsafe_allow_html=True)
                                 
                                 # Show overview
                                 if 'overview' in movie and not pd.isna(movie['overview']):
                                     st.write(movie['overview'][:200] + "..." if len(movie['overview']) > 200 else movie['overview'])
                                 
                                 # Add button to movie details
-                                if st.button(f"More about {movie['title']}", key=f"rec_{movie['id']}"):
-                                    st.session_state.selected_movie = movie
-                                    st.session_state.page = 'movie_details'
-                                    track_recommendation_click(movie['id'], rec_type.lower())
-                                    st.experimental_rerun()
+                                st.button(f"More about {movie['title']}", key=f"rec_{movie['id']}", on_click=select_movie, args=(movie, rec_type.lower()))
                         
                         # Export recommendations
                         st.markdown("---")
@@ -609,9 +683,7 @@ def show_recommendations_page():
         # Check if user has set preferences
         if len(st.session_state.favorite_movies) == 0 and len(st.session_state.favorite_genres) == 0:
             st.warning("You haven't set any preferences yet. Please go to the Preferences page to set your favorite movies and genres.")
-            if st.button("Go to Preferences"):
-                st.session_state.page = 'preferences'
-                st.experimental_rerun()
+            st.button("Go to Preferences", on_click=go_to_page, args=('preferences',))
         else:
             # Show current preferences
             st.subheader("Your current preferences:")
@@ -651,19 +723,15 @@ def show_recommendations_page():
                             st.success(f"Found {len(recommendations)} movies you might like!")
                             
                             # Display in a grid
-                            for i, (_, movie) in enumerate(recommendations.iterrows()):
+                            for i, movie in enumerate(recommendations.to_dict('records')):
                                 st.markdown("---")
                                 col1, col2 = st.columns([1, 3])
                                 
                                 with col1:
                                     # Show poster
-                                    if 'poster_path' in movie and movie['poster_path']:
-                                        poster_url = f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
+                                    poster_url = get_movie_poster_url(movie)
+                                    if poster_url:
                                         st.image(poster_url, width=200)
-                                    elif 'id' in movie:
-                                        poster_url = get_poster_url(movie['id'])
-                                        if poster_url:
-                                            st.image(poster_url, width=200)
                                 
                                 with col2:
                                     st.subheader(movie['title'])
@@ -682,18 +750,14 @@ def show_recommendations_page():
                                     
                                     # Show rating
                                     if 'vote_average' in movie and not pd.isna(movie['vote_average']):
-                                        st.markdown(f"<div class='rating'>{create_star_rating(movie['vote_average'])}</div>", unsafe_allow_html=True)
+                                        st.markdown(f"<div class='rating'>{get_star_rating(movie)}</div>", unsafe_allow_html=True)
                                     
                                     # Show overview
                                     if 'overview' in movie and not pd.isna(movie['overview']):
                                         st.write(movie['overview'][:200] + "..." if len(movie['overview']) > 200 else movie['overview'])
                                     
                                     # Add button to movie details
-                                    if st.button(f"More about {movie['title']}", key=f"user_rec_{movie['id']}"):
-                                        st.session_state.selected_movie = movie
-                                        st.session_state.page = 'movie_details'
-                                        track_recommendation_click(movie['id'], 'user_preferences')
-                                        st.experimental_rerun()
+                                    st.button(f"More about {movie['title']}", key=f"user_rec_{movie['id']}", on_click=select_movie, args=(movie, 'user_preferences'))
                             
                             # Export recommendations
                             st.markdown("---")
@@ -722,24 +786,27 @@ def show_recommendations_page():
                         st.error(f"Error getting recommendations: {str(e)}")
 
 # Movie details page
+@st.fragment
 def show_movie_details_page():
     # Check if a movie is selected
     if st.session_state.selected_movie is None:
         st.warning("No movie selected. Please select a movie first.")
-        if st.button("Go to Home"):
-            st.session_state.page = 'home'
-            st.experimental_rerun()
+        st.button("Go to Home", on_click=go_to_page, args=('home',))
         return
     
-    movie = st.session_state.selected_movie
+    # Normalize missing values once so the checks below are plain None tests
+    movie = {
+        key: None if pd.api.types.is_scalar(value) and pd.isna(value) else value
+        for key, value in st.session_state.selected_movie.items()
+    }
     
     # Track view
-    if 'id' in movie:
+    if movie.get('id') is not None:
         track_movie_view(movie['id'])
     
     # Get backdrop for the movie
     backdrop_url = None
-    if 'id' in movie:
+    if movie.get('id') is not None:
         backdrop_url = get_movie_backdrop(movie['id'])
     
     # If backdrop available, use it as background
@@ -748,7 +815,7 @@ def show_movie_details_page():
     
     # Movie title and year
     st.title(movie['title'])
-    if 'year' in movie and not pd.isna(movie['year']):
+    if movie.get('year') is not None:
         st.subheader(f"({int(movie['year'])})")
     
     # Movie details
@@ -756,46 +823,37 @@ def show_movie_details_page():
     
     with col1:
         # Show poster
-        if 'poster_path' in movie and movie['poster_path']:
-            poster_url = f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
+        poster_url = get_movie_poster_url(movie)
+        if poster_url:
             st.image(poster_url, width=300)
-        elif 'id' in movie:
-            poster_url = get_poster_url(movie['id'])
-            if poster_url:
-                st.image(poster_url, width=300)
         
         # Rating
-        if 'vote_average' in movie and not pd.isna(movie['vote_average']):
-            st.markdown(f"<div class='rating' style='font-size: 1.5em;'>{create_star_rating(movie['vote_average'])}</div>", unsafe_allow_html=True)
+        if movie.get('vote_average') is not None:
+            st.markdown(f"<div class='rating' style='font-size: 1.5em;'>{get_star_rating(movie)}</div>", unsafe_allow_html=True)
         
         # Votes
-        if 'vote_count' in movie and not pd.isna(movie['vote_count']):
+        if movie.get('vote_count') is not None:
             st.write(f"**Votes:** {int(movie['vote_count'])}")
         
         # Add to favorites button
         if movie['title'] in st.session_state.favorite_movies:
-            if st.button("❤️ Remove from Favorites"):
-                st.session_state.favorite_movies.remove(movie['title'])
-                st.success(f"Removed '{movie['title']}' from your favorites")
-                st.experimental_rerun()
+            st.button("❤️ Remove from Favorites", on_click=remove_favorite_movie, args=(movie['title'],))
         else:
-            if st.button("🤍 Add to Favorites"):
-                st.session_state.favorite_movies.append(movie['title'])
-                st.success(f"Added '{movie['title']}' to your favorites")
-                st.experimental_rerun()
+            st.button("🤍 Add to Favorites", on_click=add_favorite_movie, args=(movie['title'],))
+        show_notice('movie_notice')
     
     with col2:
         # Tagline
-        if 'tagline' in movie and not pd.isna(movie['tagline']) and movie['tagline'] != '':
+        if movie.get('tagline') is not None and movie['tagline'] != '':
             st.markdown(f"*{movie['tagline']}*")
         
         # Overview
-        if 'overview' in movie and not pd.isna(movie['overview']):
+        if movie.get('overview') is not None:
             st.subheader("Overview")
             st.write(movie['overview'])
         
         # Genres
-        if 'genres' in movie and not pd.isna(movie['genres']):
+        if movie.get('genres') is not None:
             st.subheader("Genres")
             st.write(format_genres(movie['genres']))
         
@@ -807,28 +865,28 @@ def show_movie_details_page():
         
         with col1:
             # Runtime
-            if 'runtime' in movie and not pd.isna(movie['runtime']):
+            if movie.get('runtime') is not None:
                 st.write(f"**Runtime:** {movie['runtime']} minutes")
             
             # Release date
-            if 'release_date' in movie and not pd.isna(movie['release_date']):
+            if movie.get('release_date') is not None:
                 st.write(f"**Release Date:** {movie['release_date']}")
             
             # Budget
-            if 'budget' in movie and not pd.isna(movie['budget']) and movie['budget'] > 0:
+            if movie.get('budget') is not None and movie['budget'] > 0:
                 st.write(f"**Budget:** ${movie['budget']:,}")
         
         with col2:
             # Revenue
-            if 'revenue' in movie and not pd.isna(movie['revenue']) and movie['revenue'] > 0:
+            if movie.get('revenue') is not None and movie['revenue'] > 0:
                 st.write(f"**Revenue:** ${movie['revenue']:,}")
             
             # Popularity
-            if 'popularity' in movie and not pd.isna(movie['popularity']):
+            if movie.get('popularity') is not None:
                 st.write(f"**Popularity:** {movie['popularity']:.1f}")
             
             # Original language
-            if 'original_language' in movie and not pd.isna(movie['original_language']):
+            if movie.get('original_language') is not None:
                 st.write(f"**Original Language:** {movie['original_language'].upper()}")
     
     # Similar Movies
@@ -839,9 +897,13 @@ def show_movie_details_page():
         try:
             similar_movies = recommender.get_content_based_recommendations(movie['title'], n=6)
             
+            # Resolve and download all posters concurrently before rendering
+            similar_movies = add_poster_urls(similar_movies)[0]
+            poster_images = prefetch_images(similar_movies['poster_url'].tolist())
+            
             # Display in a grid
             cols = st.columns(3)
-            for i, (_, sim_movie) in enumerate(similar_movies.iterrows()):
+            for i, sim_movie in enumerate(similar_movies.to_dict('records')):
                 with cols[i % 3]:
                     st.markdown(f"""
                     <div class="movie-card">
@@ -849,26 +911,20 @@ def show_movie_details_page():
                     """, unsafe_allow_html=True)
                     
                     # Show poster
-                    if 'poster_path' in sim_movie and sim_movie['poster_path']:
-                        poster_url = f"https://image.tmdb.org/t/p/w500{sim_movie['poster_path']}"
-                        st.image(poster_url, use_column_width=True)
-                    elif 'id' in sim_movie:
-                        poster_url = get_poster_url(sim_movie['id'])
-                        if poster_url:
-                            st.image(poster_url, use_column_width=True)
+                    poster = poster_images[i] or sim_movie['poster_url']
+                    if poster:
+                        st.image(poster, use_column_width=True)
                     
                     # Add rating
                     if 'vote_average' in sim_movie:
-                        st.markdown(f"<div class='rating'>{create_star_rating(sim_movie['vote_average'])}</div>", unsafe_allow_html=True)
+                        st.markdown(f"<div class='rating'>{get_star_rating(sim_movie)}</div>", unsafe_allow_html=True)
                     
                     # Add similarity score
                     if 'similarity_score' in sim_movie:
                         st.write(f"**Similarity:** {sim_movie['similarity_score']:.2f}")
                     
                     # Add button to movie details
-                    if st.button(f"More about {sim_movie['title']}", key=f"similar_{sim_movie['id']}"):
-                        st.session_state.selected_movie = sim_movie
-                        st.experimental_rerun()
+                    st.button(f"More about {sim_movie['title']}", key=f"similar_{sim_movie['id']}", on_click=select_movie, args=(sim_movie,))
         except Exception as e:
             st.error(f"Error finding similar movies: {str(e)}")
             
@@ -877,16 +933,13 @@ def show_movie_details_page():
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("← Back to Home"):
-            st.session_state.page = 'home'
-            st.experimental_rerun()
+        st.button("← Back to Home", on_click=go_to_page, args=('home',))
     
     with col2:
-        if st.button("Get More Recommendations →"):
-            st.session_state.page = 'recommendations'
-            st.experimental_rerun()
+        st.button("Get More Recommendations →", on_click=go_to_page, args=('recommendations',))
 
 # Preferences page
+@st.fragment
 def show_preferences_page():
     st.title("⚙️ Preferences")
     st.write("Set your movie preferences to get personalized recommendations")
@@ -895,7 +948,8 @@ def show_preferences_page():
     if movies_df is None or len(movies_df) == 0:
         st.error("Movie data is not available. Please try reloading the page.")
         if st.button("Retry Loading Data"):
-            st.experimental_rerun()
+            load_data.clear()
+            st.rerun()
         return
     
     # Favorite Movies
@@ -909,9 +963,7 @@ def show_preferences_page():
             with col1:
                 st.write(f"{i+1}. {movie}")
             with col2:
-                if st.button("Remove", key=f"remove_{i}"):
-                    st.session_state.favorite_movies.pop(i)
-                    st.experimental_rerun()
+                st.button("Remove", key=f"remove_{i}", on_click=remove_favorite_movie, args=(movie,))
     else:
         st.write("You haven't added any favorite movies yet.")
     
@@ -923,42 +975,25 @@ def show_preferences_page():
     
     # Autocomplete suggestions
     if new_movie and movies_df is not None:
-        suggestions = movies_df[movies_df['title'].str.contains(new_movie, case=False)]['title'].head(5).tolist()
+        matches = np.flatnonzero(search_text_buffer(search_index['title'], new_movie))[:5]
+        suggestions = movies_df['title'].iloc[matches].tolist()
         if suggestions:
             selected_suggestion = st.selectbox("Select from suggestions:", [""] + suggestions)
             if selected_suggestion:
                 new_movie = selected_suggestion
     
-    if st.button("Add to Favorites") and new_movie and movies_df is not None:
-        # Check if movie exists in dataset
-        if new_movie in movies_df['title'].values:
-            if new_movie not in st.session_state.favorite_movies:
-                st.session_state.favorite_movies.append(new_movie)
-                st.success(f"Added '{new_movie}' to your favorites")
-                st.experimental_rerun()
-            else:
-                st.warning(f"'{new_movie}' is already in your favorites")
-        else:
-            st.error(f"Movie '{new_movie}' not found in our database")
+    # Only titles in the dataset get the callback; anything else reports an error on click
+    movie_exists = bool(new_movie) and new_movie in movies_df['title'].values
+    if st.button("Add to Favorites", on_click=add_favorite_movie if movie_exists else None, args=(new_movie,)) and new_movie and not movie_exists:
+        st.error(f"Movie '{new_movie}' not found in our database")
+    show_notice('movie_notice')
     
     # Favorite Genres
     st.markdown("---")
     st.subheader("Your Favorite Genres")
     
-    # Get all unique genres
-    all_genres = []
-    if movies_df is not None and 'genres' in movies_df.columns:
-        for genre_list in movies_df['genres'].dropna():
-            try:
-                genres = json.loads(genre_list.replace("'", "\""))
-                if isinstance(genres, list):
-                    all_genres.extend([g['name'] for g in genres if 'name' in g])
-            except:
-                # If not JSON format, try simple string splitting
-                if isinstance(genre_list, str):
-                    all_genres.extend([g.strip() for g in genre_list.split(',')])
-    
-    unique_genres = sorted(list(set(all_genres)))
+    # Unique genres are computed once with the cached search index
+    unique_genres = search_index.get('unique_genres', [])
     
     # Display current favorite genres
     if len(st.session_state.favorite_genres) > 0:
@@ -968,9 +1003,7 @@ def show_preferences_page():
             with col1:
                 st.write(f"{i+1}. {genre}")
             with col2:
-                if st.button("Remove", key=f"remove_genre_{i}"):
-                    st.session_state.favorite_genres.pop(i)
-                    st.experimental_rerun()
+                st.button("Remove", key=f"remove_genre_{i}", on_click=remove_favorite_genre, args=(genre,))
     else:
         st.write("You haven't added any favorite genres yet.")
     
@@ -979,13 +1012,8 @@ def show_preferences_page():
     
     new_genre = st.selectbox("Select genre:", [""] + unique_genres)
     
-    if st.button("Add Genre") and new_genre:
-        if new_genre not in st.session_state.favorite_genres:
-            st.session_state.favorite_genres.append(new_genre)
-            st.success(f"Added '{new_genre}' to your favorite genres")
-            st.experimental_rerun()
-        else:
-            st.warning(f"'{new_genre}' is already in your favorite genres")
+    st.button("Add Genre", on_click=add_favorite_genre if new_genre else None, args=(new_genre,))
+    show_notice('genre_notice')
     
     # Theme preferences
     st.markdown("---")
@@ -997,9 +1025,7 @@ def show_preferences_page():
     # Get recommendations based on preferences
     st.markdown("---")
     if len(st.session_state.favorite_movies) > 0 or len(st.session_state.favorite_genres) > 0:
-        if st.button("Get Recommendations Based on Preferences"):
-            st.session_state.page = 'recommendations'
-            st.experimental_rerun()
+        st.button("Get Recommendations Based on Preferences", on_click=go_to_page, args=('recommendations',))
 
 # Main app layout and functionality
 def main():
@@ -5,11 +5,10 @@ This will download the TMDB 5000 Movie Dataset and save it to the data directory
 """
 
 import os
-import requests
 import pandas as pd
-import time
 import sys
 from src.data_processor import DataProcessor
+from src.utils import download_file
 
 def download_sample_data():
     """Download sample TMDB movie data and process it"""
@@ -32,31 +31,14 @@ def download_sample_data():
         print("Downloading sample TMDB dataset...")
         url = "https://raw.githubusercontent.com/Kamal2511/Movie-Recommender-System/main/tmdb_5000_movies.csv"
         
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # Download and save
-                response = requests.get(url, timeout=30)
-                if response.status_code == 200:
-                    with open(data_path, 'wb') as f:
-                        f.write(response.content)
-                    print(f"Sample data downloaded and saved to {data_path}")
-                    break
-                else:
-                    print(f"Failed to download data: HTTP {response.status_code}")
-                    if attempt < max_retries - 1:
-                        wait_time = 2 ** attempt  # Exponential backoff
-                        print(f"Retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
-            except Exception as e:
-                print(f"Error downloading sample data (attempt {attempt+1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt
-                    print(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    print("All download attempts failed.")
-                    return False
+        try:
+            # Stream straight to disk; the shared session retries failed requests with backoff
+            download_file(url, data_path)
+            print(f"Sample data downloaded and saved to {data_path}")
+        except Exception as e:
+            print(f"Error downloading sample data: {e}")
+            print("All download attempts failed.")
+            return False
     else:
         print(f"Sample data already exists at {data_path}")
     
@@ -69,7 +51,7 @@ def download_sample_data():
             processor = DataProcessor(data_path)
             movies_df = processor.load_data()
             movies_df = processor.preprocess_data()
-            similarity_matrix = processor.compute_similarity_matrix()
+            feature_matrix = processor.compute_feature_matrix()
             
             # Save processed data
             processor.save_processed_data(processed_path)
@@ -1,11 +1,41 @@
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 import pickle
 import os
-import re
-from datetime import datetime
+from src.recommender import contains_mask, top_n
+from src.utils import create_star_rating, parse_genre_names
+
+# Columns read from the raw movie CSV and kept after preprocessing; anything else
+# is never displayed or used
+MOVIE_COLUMNS = [
+    'id', 'title', 'overview', 'genres', 'keywords', 'tagline', 'release_date',
+    'poster_path', 'popularity', 'vote_average', 'vote_count', 'rating', 'runtime',
+    'budget', 'revenue', 'original_language'
+]
+
+# Columns derived in preprocess_data that the app and recommender read
+DERIVED_COLUMNS = [
+    'year', 'combined_features', '_title_lower', 'genre_names', 'poster_url', 'stars_html',
+    'weighted_rating'
+]
+
+# vote_average stays float64 since it feeds the weighted rating maths; float32 would
+# only save 4 bytes a row at the cost of rounding drift
+MOVIE_DTYPES = {
+    'title': 'string',
+    'overview': 'string',
+    'genres': 'string',
+    'keywords': 'string',
+    'tagline': 'string',
+    'release_date': 'string',
+    'poster_path': 'string',
+    'original_language': 'string',
+    'vote_average': 'float64',
+    'popularity': 'float64'
+}
 
 class DataProcessor:
     def __init__(self, data_path=None):
@@ -22,7 +52,16 @@ class DataProcessor:
         if not self.data_path:
             raise ValueError("No data path provided")
             
-        self.movies_df = pd.read_csv(self.data_path)
+        # Only parse the columns the app uses, with the multithreaded Arrow CSV reader
+        header = pd.read_csv(self.data_path, nrows=0).columns
+        usecols = [col for col in header if col in MOVIE_COLUMNS] or None
+        dtype = {col: col_type for col, col_type in MOVIE_DTYPES.items() if usecols and col in usecols}
+        
+        try:
+            self.movies_df = pd.read_csv(self.data_path, engine='pyarrow', usecols=usecols, dtype=dtype)
+        except:
+            # Quoted newlines or malformed numbers need the default parser
+            self.movies_df = pd.read_csv(self.data_path, usecols=usecols, low_memory=False)
         return self.movies_df
     
     def preprocess_data(self):
@@ -36,90 +75,175 @@ class DataProcessor:
         # Handle missing values
         self.movies_df['overview'] = self.movies_df['overview'].fillna('')
         
-        # Create a combined text feature for content-based filtering
-        self.movies_df['combined_features'] = self.movies_df.apply(self._create_combined_features, axis=1)
+        # Lowercase titles once for case-insensitive title matching
+        self.movies_df['_title_lower'] = self.movies_df['title'].fillna('').astype(str).str.lower()
+        
+        # Parse genres once so the app can filter and list them without re-parsing
+        if 'genres' in self.movies_df.columns:
+            self.movies_df['genre_names'] = self.movies_df['genres'].map(parse_genre_names)
+        
+        # Create a combined text feature for content-based filtering, one vectorized
+        # concatenation per text column with missing values contributing nothing
+        combined = pd.Series('', index=self.movies_df.index, dtype=object)
+        for col in ['genres', 'overview', 'keywords']:
+            if col in self.movies_df.columns:
+                values = self.movies_df[col]
+                combined += (values.astype(str) + ' ').where(values.notna(), '').astype(object)
+        self.movies_df['combined_features'] = combined.str.lower()
         
         # Create year column from release_date if available
         if 'release_date' in self.movies_df.columns:
-            self.movies_df['year'] = self.movies_df['release_date'].apply(self._extract_year)
+            dates = self.movies_df['release_date']
+            years = pd.to_datetime(dates, format='%Y-%m-%d', errors='coerce').dt.year.astype(float)
+            
+            # Dates in other formats fall back to the first four-digit number
+            missing = years.isna() & dates.notna() & (dates != '')
+            if missing.any():
+                years[missing] = dates[missing].astype(str).str.extract(r'(\d{4})', expand=False).astype(float)
+            # Nullable small ints keep missing years as NA in a quarter of the space
+            self.movies_df['year'] = years.astype('Int16')
         
-        return self.movies_df
-    
-    def _create_combined_features(self, row):
-        """Combine relevant features into a single text for TF-IDF processing"""
-        combined = ""
+        # Precompute display columns so the app does not rebuild them for every card
+        if 'poster_path' in self.movies_df.columns:
+            poster_path = self.movies_df['poster_path']
+            self.movies_df['poster_url'] = np.where(
+                poster_path.notna() & (poster_path != ''),
+                'https://image.tmdb.org/t/p/w500' + poster_path.fillna('').astype(str),
+                ''
+            )
+        if 'vote_average' in self.movies_df.columns:
+            self.movies_df['stars_html'] = self.movies_df['vote_average'].map(create_star_rating)
         
-        # Add genres if available
-        if 'genres' in self.movies_df.columns and pd.notna(row['genres']):
-            combined += str(row['genres']) + " "
+        # IMDb-style weighted rating, shrinking movies with few votes toward the mean
+        if 'vote_average' in self.movies_df.columns and 'vote_count' in self.movies_df.columns:
+            vote_counts = self.movies_df['vote_count'].astype(float)
+            mean_rating = self.movies_df['vote_average'].mean()
+            min_votes = vote_counts.quantile(0.9)
+            self.movies_df['weighted_rating'] = (
+                vote_counts / (vote_counts + min_votes) * self.movies_df['vote_average'] +
+                min_votes / (vote_counts + min_votes) * mean_rating
+            )
         
-        # Add overview if available
-        if 'overview' in self.movies_df.columns and pd.notna(row['overview']):
-            combined += str(row['overview']) + " "
-            
-        # Add keywords if available
-        if 'keywords' in self.movies_df.columns and pd.notna(row['keywords']):
-            combined += str(row['keywords']) + " "
+        # Drop columns nothing reads, such as the JSON blobs for companies and languages
+        keep = [col for col in MOVIE_COLUMNS + DERIVED_COLUMNS if col in self.movies_df.columns]
+        self.movies_df = self.movies_df[keep].copy()
+        
+        # A handful of language codes repeat across every row
+        if 'original_language' in self.movies_df.columns:
+            self.movies_df['original_language'] = self.movies_df['original_language'].astype('category')
         
-        return combined.lower()
+        return self.movies_df
     
-    def _extract_year(self, date_str):
-        """Extract year from date string"""
-        if pd.isna(date_str) or date_str == '':
-            return np.nan
-        try:
-            return datetime.strptime(date_str, '%Y-%m-%d').year
-        except:
-            # Try to extract year with regex
-            year_match = re.search(r'(\d{4})', str(date_str))
-            if year_match:
-                return int(year_match.group(1))
-            return np.nan
-    
-    def compute_similarity_matrix(self):
-        """Compute TF-IDF and cosine similarity matrix for content-based filtering"""
+    def compute_feature_matrix(self):
+        """Compute the TF-IDF feature matrix used for content-based filtering"""
         if self.movies_df is None or 'combined_features' not in self.movies_df.columns:
             raise ValueError("Data not properly preprocessed. Call preprocess_data() first.")
         
-        # Initialize TF-IDF Vectorizer
-        self.tfidf_vectorizer = TfidfVectorizer(stop_words='english')
+        # Initialize TF-IDF Vectorizer in float32, the dtype the recommender scores in.
+        # Terms seen in a single movie or in most movies add nonzeros without helping rankings.
+        self.tfidf_vectorizer = TfidfVectorizer(
+            stop_words='english',
+            dtype=np.float32,
+            min_df=2,
+            max_df=0.85,
+            sublinear_tf=True,
+            max_features=50000,
+            strip_accents='unicode'
+        )
         
         # Construct the TF-IDF matrix
-        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.movies_df['combined_features'])
+        tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.movies_df['combined_features'])
         
-        # Compute the cosine similarity matrix
-        cosine_sim = cosine_similarity(self.tfidf_matrix, self.tfidf_matrix)
+        # Rows are L2-normalized, so cosine similarity is a plain dot product that
+        # the recommender computes per query instead of materializing an NxN matrix
+        self.tfidf_matrix = self._prepare_feature_matrix(tfidf_matrix)
+        
+        return self.tfidf_matrix
+    
+    def _prepare_feature_matrix(self, matrix):
+        """Convert a feature matrix to L2-normalized float32 CSR with sorted indices"""
+        matrix = normalize(sparse.csr_matrix(matrix), norm='l2').astype(np.float32)
+        matrix.sort_indices()
+        return matrix
+    
+    def _movies_path(self, path):
+        """Get the path of the feather file stored next to the processed data pickle"""
+        return os.path.splitext(path)[0] + '_movies.feather'
+    
+    def _feature_matrix_path(self, path):
+        """Get the path of the TF-IDF matrix stored next to the processed data"""
+        return os.path.splitext(path)[0] + '_tfidf.npz'
+    
+    def _load_feature_matrix(self, path):
+        """Load a TF-IDF matrix saved by save_processed_data as float32 CSR"""
+        with np.load(path) as arrays:
+            if 'format' in arrays:
+                # Written by scipy.sparse.save_npz in older versions
+                matrix = sparse.load_npz(path)
+            else:
+                matrix = sparse.csr_matrix(
+                    (arrays['data'].astype(np.float32), arrays['indices'], arrays['indptr']),
+                    shape=tuple(arrays['shape'])
+                )
         
-        return cosine_sim
+        # Renormalize since float16 rounding leaves row norms slightly off 1
+        return self._prepare_feature_matrix(matrix)
     
     def save_processed_data(self, output_path):
-        """Save processed data and similarity matrix to disk"""
+        """Save processed data and TF-IDF matrix to disk"""
         if self.movies_df is None:
             raise ValueError("No data processed. Call preprocess_data() first.")
         
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        # Save processed data as pickle file
+        # Save the dataframe as Arrow IPC (feather) and the vectorizer as pickle
+        self.movies_df = self.movies_df.reset_index(drop=True)
+        self.movies_df.to_feather(self._movies_path(output_path), compression='zstd')
+        
         data_to_save = {
-            'movies_df': self.movies_df,
-            'tfidf_matrix': self.tfidf_matrix,
             'tfidf_vectorizer': self.tfidf_vectorizer
         }
         
         with open(output_path, 'wb') as f:
-            pickle.dump(data_to_save, f)
+            pickle.dump(data_to_save, f, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        # Save the sparse TF-IDF matrix as raw CSR arrays alongside the pickle.
+        # Weights are stored as float16 to halve the file; rankings don't change at that precision.
+        if self.tfidf_matrix is not None:
+            np.savez_compressed(
+                self._feature_matrix_path(output_path),
+                data=self.tfidf_matrix.data.astype(np.float16),
+                indices=self.tfidf_matrix.indices,
+                indptr=self.tfidf_matrix.indptr,
+                shape=np.array(self.tfidf_matrix.shape)
+            )
             
         print(f"Processed data saved to {output_path}")
     
     def load_processed_data(self, input_path):
-        """Load processed data and similarity matrix from disk"""
+        """Load processed data and TF-IDF matrix from disk"""
         with open(input_path, 'rb') as f:
             data = pickle.load(f)
         
-        self.movies_df = data['movies_df']
-        self.tfidf_matrix = data['tfidf_matrix']
+        movies_path = self._movies_path(input_path)
+        if os.path.exists(movies_path):
+            self.movies_df = pd.read_feather(movies_path, dtype_backend='pyarrow')
+        else:
+            # Older processed data kept the dataframe inside the pickle
+            self.movies_df = data['movies_df']
         self.tfidf_vectorizer = data['tfidf_vectorizer']
+        data['movies_df'] = self.movies_df
+        
+        feature_path = self._feature_matrix_path(input_path)
+        if os.path.exists(feature_path):
+            self.tfidf_matrix = self._load_feature_matrix(feature_path)
+        elif data.get('tfidf_matrix') is not None:
+            # Older processed data kept the TF-IDF matrix inside the pickle
+            self.tfidf_matrix = self._prepare_feature_matrix(data['tfidf_matrix'])
+        else:
+            self.tfidf_matrix = None
+        data['tfidf_matrix'] = self.tfidf_matrix
         
         print(f"Processed data loaded from {input_path}")
         return data
@@ -129,15 +253,16 @@ class DataProcessor:
         if 'year' not in self.movies_df.columns:
             raise ValueError("Year column not available in dataset")
         
-        return self.movies_df[(self.movies_df['year'] >= start_year) & 
-                             (self.movies_df['year'] <= end_year)]
+        # Missing years compare as NA, which never matches a range
+        in_range = (self.movies_df['year'] >= start_year) & (self.movies_df['year'] <= end_year)
+        return self.movies_df[in_range.fillna(False).astype(bool)]
     
     def get_movies_by_genre(self, genre):
         """Filter movies by genre"""
         if 'genres' not in self.movies_df.columns:
             raise ValueError("Genres column not available in dataset")
         
-        return self.movies_df[self.movies_df['genres'].str.contains(genre, case=False, na=False)]
+        return self.movies_df[contains_mask(self.movies_df['genres'], genre)]
     
     def get_movies_by_rating(self, min_rating):
         """Filter movies by minimum rating"""
@@ -153,6 +278,10 @@ class DataProcessor:
     
     def get_top_rated_movies(self, n=10):
         """Get top N rated movies"""
+        # Use the weighted rating computed during preprocessing when available
+        if 'weighted_rating' in self.movies_df.columns:
+            return top_n(self.movies_df, 'weighted_rating', n)
+        
         rating_col = None
         if 'vote_average' in self.movies_df.columns:
             rating_col = 'vote_average'
@@ -170,7 +299,7 @@ class DataProcessor:
         else:
             filtered_df = self.movies_df
             
-        return filtered_df.sort_values(by=rating_col, ascending=False).head(n)
+        return top_n(filtered_df, rating_col, n)
     
     def get_most_popular_movies(self, n=10):
         """Get most popular movies based on vote count or popularity metric"""
@@ -182,18 +311,25 @@ class DataProcessor:
         else:
             raise ValueError("Popularity or vote count column not available in dataset")
             
-        return self.movies_df.sort_values(by=pop_col, ascending=False).head(n)
+        return top_n(self.movies_df, pop_col, n)
     
     def get_most_recent_movies(self, n=10):
         """Get most recent movies"""
         if 'year' not in self.movies_df.columns:
             raise ValueError("Year column not available in dataset")
             
-        return self.movies_df.sort_values(by='year', ascending=False).head(n)
+        return top_n(self.movies_df, 'year', n)
     
     def search_movies(self, query):
         """Search for movies by title"""
         if self.movies_df is None:
             raise ValueError("No data loaded. Call load_data() first.")
             
-        return self.movies_df[self.movies_df['title'].str.contains(query, case=False, na=False)] 
\ No newline at end of file
+        titles = self._lowercase_titles()
+        return self.movies_df[titles.str.contains(query.lower(), regex=False, na=False)]
+    
+    def _lowercase_titles(self):
+        """Get lowercase titles, from the precomputed column when available"""
+        if '_title_lower' in self.movies_df.columns:
+            return self.movies_df['_title_lower']
+        return self.movies_df['title'].str.lower()
\ No newline at end of file
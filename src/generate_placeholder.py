@@ -34,10 +34,11 @@ def generate_placeholder():
     # Add text
     text = "No Poster Available"
     
-    # Calculate text position to center it
-    textwidth, textheight = draw.textsize(text, font=font) if hasattr(draw, 'textsize') else (150, 30)
-    x = (500 - textwidth) // 2
-    y = (750 - textheight) // 2
+    # Calculate text position to center it from the rendered bounding box
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    textwidth, textheight = right - left, bottom - top
+    x = (500 - textwidth) // 2 - left
+    y = (750 - textheight) // 2 - top
     
     # Draw text on image
     draw.text((x, y), text, fill=(200, 200, 200), font=font)
@@ -1,60 +1,212 @@
+from functools import lru_cache
 import numpy as np
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
+
+def _top_k_indices(scores, k):
+    """Get the positions of the k highest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+        
+    # Partial selection is O(N); only the k selected scores get sorted
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+def top_n(df, column, n):
+    """Get the n rows of df with the highest values in column, highest first"""
+    values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    return df.iloc[_top_k_indices(values, n)]
+
+def _prepare_features(feature_matrix):
+    """Return the feature matrix in the layout the scoring kernels expect"""
+    if feature_matrix is None:
+        return None
+        
+    if sparse.issparse(feature_matrix):
+        # Row-major float32 CSR with sorted column indices keeps each matrix-vector product
+        # a single pass over contiguous data; convert only if needed, never in place
+        if (feature_matrix.format == 'csr' and feature_matrix.dtype == np.float32
+                and feature_matrix.has_sorted_indices):
+            return feature_matrix
+        features = sparse.csr_matrix(feature_matrix, dtype=np.float32, copy=True)
+        features.sort_indices()
+        return features
+        
+    # Dense features become C-ordered float32 with unit-length rows. Copy so a caller's
+    # array is never modified; all-zero rows keep zero similarity
+    features = np.array(feature_matrix, dtype=np.float32, order='C', ndmin=2)
+    norms = np.sqrt(np.einsum('ij,ij->i', features, features))
+    norms[norms == 0] = 1
+    features /= norms[:, None]
+    return features
+
+def contains_mask(values, text):
+    """Get a boolean mask of the values containing text, ignoring case; missing values are False"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Test each category once, then gather by code; code -1 (missing) picks the trailing False
+        category_mask = values.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+        lookup = np.append(np.asarray(category_mask, dtype=bool), False)
+        return lookup[values.cat.codes.to_numpy()]
+    return values.str.contains(text, case=False, regex=False, na=False).to_numpy(dtype=bool)
 
 class MovieRecommender:
-    def __init__(self, movies_df=None, similarity_matrix=None):
-        self.movies_df = movies_df
-        self.similarity_matrix = similarity_matrix
+    def __init__(self, movies_df=None, feature_matrix=None):
+        self.set_data(movies_df, feature_matrix)
         
-    def set_data(self, movies_df, similarity_matrix=None):
+    def set_data(self, movies_df, feature_matrix=None):
         """Set the data for the recommender"""
+        # feature_matrix holds one L2-normalized feature row per movie, in movies_df order:
+        # sparse TF-IDF as built by DataProcessor, or a dense array (e.g. SVD components).
+        # Both may be shared with other sessions, so methods copy before adding columns.
         self.movies_df = movies_df
-        self.similarity_matrix = similarity_matrix
+        self.feature_matrix = _prepare_features(feature_matrix)
         
-    def get_content_based_recommendations(self, movie_title, n=10):
-        """Get content-based recommendations similar to given movie"""
-        if self.movies_df is None or len(self.movies_df) == 0:
-            raise ValueError("No movie data available. Call set_data() first.")
+        # Map exact and lowercase titles to row positions, keeping the first of any duplicates
+        self._title_to_idx = {}
+        self._title_lower_to_idx = {}
+        if movies_df is not None and 'title' in movies_df.columns:
+            for i, title in enumerate(movies_df['title'].fillna('')):
+                title = str(title)
+                self._title_to_idx.setdefault(title, i)
+                self._title_lower_to_idx.setdefault(title.lower(), i)
+                
+        # Catalog-wide maximum used to normalize popularity in hybrid scores
+        self._max_popularity = None
+        if movies_df is not None and 'popularity' in movies_df.columns:
+            self._max_popularity = movies_df['popularity'].max()
+            
+        # Catalog-wide IMDB weighted rating by movie id, used when there is no popularity column.
+        # Prefer the weighted_rating column DataProcessor persists, so both paths agree; otherwise
+        # compute it here. Kept as a separate Series so the shared movies_df is never modified.
+        self._wr_by_id = None
+        self._wr_max = None
+        if movies_df is not None and 'id' in movies_df.columns:
+            weighted_rating = None
+            if 'weighted_rating' in movies_df.columns:
+                weighted_rating = movies_df['weighted_rating']
+            elif {'vote_average', 'vote_count'} <= set(movies_df.columns):
+                vote_counts = movies_df['vote_count']
+                vote_averages = movies_df['vote_average']
+                mean_votes = vote_counts.mean()
+                mean_rating = vote_averages.mean()
+                weighted_rating = (
+                    (vote_counts / (vote_counts + mean_votes)) * vote_averages + 
+                    (mean_votes / (vote_counts + mean_votes)) * mean_rating
+                )
+            if weighted_rating is not None:
+                unique_ids = ~movies_df['id'].duplicated()
+                self._wr_by_id = pd.Series(
+                    weighted_rating[unique_ids].to_numpy(dtype=np.float64, na_value=np.nan),
+                    index=movies_df['id'][unique_ids].to_numpy()
+                )
+                self._wr_max = self._wr_by_id.max()
             
-        if self.similarity_matrix is None:
-            raise ValueError("No similarity matrix available.")
+        # Inverted index from lowercase genre name to sorted row positions, built from the
+        # genre names parsed during preprocessing
+        self._genre_index = {}
+        if movies_df is not None and 'genre_names' in movies_df.columns:
+            genre_rows = {}
+            for i, names in enumerate(movies_df['genre_names']):
+                if isinstance(names, (list, tuple, np.ndarray)):
+                    for name in names:
+                        genre_rows.setdefault(str(name).lower(), []).append(i)
+            self._genre_index = {g: np.array(rows, dtype=np.intp) for g, rows in genre_rows.items()}
             
-        # Get the index of the movie
-        idx = self.movies_df[self.movies_df['title'] == movie_title].index
+        # Title lookups, including the partial-match scan, and per-movie top-N results
+        # are cached per data set; rebinding here drops anything cached for old data
+        self._resolve_title = lru_cache(maxsize=1024)(self._find_title_index)
+        self._content_topk = lru_cache(maxsize=4096)(self._compute_content_topk)
         
-        if len(idx) == 0:
-            # Try partial match if exact match not found
-            similar_titles = self.movies_df[self.movies_df['title'].str.contains(movie_title, case=False)]
+    def _find_title_index(self, movie_title):
+        """Find the row position of a title by exact, case-insensitive, then partial match"""
+        idx = self._title_to_idx.get(movie_title)
+        if idx is None:
+            idx = self._title_lower_to_idx.get(movie_title.lower())
+        if idx is not None:
+            return idx
             
-            if len(similar_titles) > 0:
-                print(f"Exact match for '{movie_title}' not found. Using closest match: '{similar_titles.iloc[0]['title']}'")
-                idx = similar_titles.index[0]
-            else:
-                raise ValueError(f"Movie '{movie_title}' not found in the dataset.")
+        # Try partial match if exact match not found
+        if '_title_lower' in self.movies_df.columns:
+            titles = self.movies_df['_title_lower']
         else:
-            idx = idx[0]
+            titles = self.movies_df['title'].str.lower()
+        partial_match = titles.str.contains(movie_title.lower(), regex=False, na=False).to_numpy(dtype=bool)
+        similar_idx = np.flatnonzero(partial_match)
+        
+        if len(similar_idx) == 0:
+            return None
             
-        # Get similarity scores for the movie
-        sim_scores = list(enumerate(self.similarity_matrix[idx]))
+        idx = int(similar_idx[0])
+        print(f"Exact match for '{movie_title}' not found. Using closest match: '{self.movies_df['title'].iloc[idx]}'")
+        return idx
+        
+    def _similarity_scores(self, idx):
+        """Compute the cosine similarity of every movie to the movie at position idx"""
+        # Rows are unit length, so one matrix-vector product gives every cosine similarity
+        query = self.feature_matrix[idx]
+        if sparse.issparse(query):
+            # Densify the single query row so scipy runs a plain CSR matrix-vector product
+            query = query.toarray().ravel()
+        return np.asarray(self.feature_matrix @ query, dtype=np.float32).ravel()
         
-        # Sort movies by similarity score
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
+    def _compute_content_topk(self, idx, n):
+        """Get the positions and scores of the n movies most similar to the movie at position idx"""
+        scores = self._similarity_scores(idx)
         
         # Get top N most similar movies (excluding the movie itself)
-        sim_scores = sim_scores[1:n+1]
+        movie_indices = _top_k_indices(scores, n + 1)
+        movie_indices = movie_indices[movie_indices != idx][:n]
+        top_scores = scores[movie_indices]
         
-        # Get movie indices
-        movie_indices = [i[0] for i in sim_scores]
+        # The arrays are shared through the cache, so keep them read-only
+        movie_indices.flags.writeable = False
+        top_scores.flags.writeable = False
+        return movie_indices, top_scores
+        
+    def get_content_based_recommendations(self, movie_title, n=10):
+        """Get content-based recommendations similar to given movie"""
+        if self.movies_df is None or len(self.movies_df) == 0:
+            raise ValueError("No movie data available. Call set_data() first.")
+            
+        if self.feature_matrix is None:
+            raise ValueError("No feature matrix available.")
+            
+        # Get the position of the movie
+        idx = self._resolve_title(movie_title)
+        
+        if idx is None:
+            raise ValueError(f"Movie '{movie_title}' not found in the dataset.")
+            
+        # Get the top N most similar movies and their scores
+        movie_indices, scores = self._content_topk(idx, n)
         
         # Return the top N similar movies
         recommendations = self.movies_df.iloc[movie_indices].copy()
         
         # Add similarity score to the dataframe
-        recommendations['similarity_score'] = [i[1] for i in sim_scores]
+        recommendations['similarity_score'] = scores
         
         return recommendations
     
+    def _recommend_for_favorites(self, favorite_idx, n):
+        """Get the n movies closest to any of the favorite movies at positions favorite_idx"""
+        # One matrix product scores every movie against every favorite; keep the best match
+        queries = self.feature_matrix[favorite_idx]
+        if sparse.issparse(queries):
+            queries = queries.toarray()
+        scores = np.asarray(self.feature_matrix @ queries.T, dtype=np.float32).max(axis=1)
+        
+        # Never recommend the favorites themselves
+        scores[favorite_idx] = -np.inf
+        
+        movie_indices = _top_k_indices(scores, n)
+        movie_indices = movie_indices[np.isfinite(scores[movie_indices])]
+        
+        recommendations = self.movies_df.iloc[movie_indices].copy()
+        recommendations['similarity_score'] = scores[movie_indices]
+        return recommendations
+        
     def get_popularity_based_recommendations(self, n=10):
         """Get recommendations based on popularity"""
         if self.movies_df is None or len(self.movies_df) == 0:
@@ -62,11 +214,11 @@ class MovieRecommender:
             
         # Check for popularity column
         if 'popularity' in self.movies_df.columns:
-            return self.movies_df.sort_values('popularity', ascending=False).head(n)
+            return top_n(self.movies_df, 'popularity', n)
         
         # Try vote count if popularity not available
         elif 'vote_count' in self.movies_df.columns:
-            return self.movies_df.sort_values('vote_count', ascending=False).head(n)
+            return top_n(self.movies_df, 'vote_count', n)
             
         # Try vote average if vote count not available
         elif 'vote_average' in self.movies_df.columns:
@@ -80,7 +232,7 @@ class MovieRecommender:
             # Filter out movies with low vote counts
             qualified = self.movies_df[self.movies_df['vote_count'] >= min_votes]
             
-            return qualified.sort_values('vote_average', ascending=False).head(n)
+            return top_n(qualified, 'vote_average', n)
         
         else:
             # Fallback to returning some random movies
@@ -94,16 +246,20 @@ class MovieRecommender:
         if 'genres' not in self.movies_df.columns:
             raise ValueError("Genres column not available in dataset")
             
-        # Filter movies by genre
-        genre_movies = self.movies_df[self.movies_df['genres'].str.contains(genre, case=False, na=False)]
+        # Filter movies by genre, scanning the raw genre strings only for names not in the index
+        genre_idx = self._genre_index.get(genre.lower())
+        if genre_idx is not None:
+            genre_movies = self.movies_df.iloc[genre_idx]
+        else:
+            genre_movies = self.movies_df[contains_mask(self.movies_df['genres'], genre)]
         
         # If there are popularity or vote metrics, sort by them
         if 'popularity' in genre_movies.columns:
-            return genre_movies.sort_values('popularity', ascending=False).head(n)
+            return top_n(genre_movies, 'popularity', n)
         elif 'vote_average' in genre_movies.columns and 'vote_count' in genre_movies.columns:
             # Only consider movies with a minimum number of votes
             qualified = genre_movies[genre_movies['vote_count'] >= genre_movies['vote_count'].quantile(0.5)]
-            return qualified.sort_values('vote_average', ascending=False).head(n)
+            return top_n(qualified, 'vote_average', n)
         else:
             # Return random selection if no popularity metrics
             return genre_movies.sample(min(n, len(genre_movies)))
@@ -120,71 +276,52 @@ class MovieRecommender:
             # If movie not found, fall back to popularity-based only
             return self.get_popularity_based_recommendations(n=n)
             
+        # Do the score arithmetic on plain arrays and assign each result column once
+        similarity = content_recs['similarity_score'].to_numpy(dtype=np.float64, na_value=np.nan)
+        
         # Normalize similarity scores to 0-1 range
-        if 'similarity_score' in content_recs.columns:
-            max_sim = content_recs['similarity_score'].max()
-            if max_sim > 0:
-                content_recs['similarity_score'] = content_recs['similarity_score'] / max_sim
-                
-        # Get popularity score
+        max_sim = similarity.max() if len(similarity) > 0 else 0
+        if max_sim > 0:
+            similarity = similarity / max_sim
+        content_recs['similarity_score'] = similarity
+        
+        # Get popularity score; content_recs rows come from movies_df, so they already carry it
         if 'popularity' in self.movies_df.columns:
-            # Merge popularity scores
-            content_recs = content_recs.merge(
-                self.movies_df[['id', 'popularity']], 
-                on='id', 
-                suffixes=('', '_y')
-            )
+            popularity = content_recs['popularity'].to_numpy(dtype=np.float64, na_value=np.nan)
             
             # Normalize popularity to 0-1 range
-            max_pop = self.movies_df['popularity'].max()
+            max_pop = self._max_popularity
             if max_pop > 0:
-                content_recs['popularity_norm'] = content_recs['popularity'] / max_pop
+                popularity_norm = popularity / max_pop
             else:
-                content_recs['popularity_norm'] = 0
-                
+                popularity_norm = np.zeros_like(popularity)
+            content_recs['popularity_norm'] = popularity_norm
+            
             # Calculate hybrid score
-            content_recs['hybrid_score'] = (
-                weight_content * content_recs['similarity_score'] + 
-                weight_popularity * content_recs['popularity_norm']
-            )
+            hybrid_score = weight_content * similarity + weight_popularity * popularity_norm
         elif 'vote_average' in self.movies_df.columns and 'vote_count' in self.movies_df.columns:
-            # Alternative popularity metric
-            content_recs = content_recs.merge(
-                self.movies_df[['id', 'vote_average', 'vote_count']], 
-                on='id', 
-                suffixes=('', '_y')
-            )
-            
-            # Calculate weighted rating
-            vote_counts = content_recs['vote_count']
-            vote_averages = content_recs['vote_average']
-            mean_votes = vote_counts.mean()
-            mean_rating = vote_averages.mean()
-            
-            # Weighted rating formula (IMDB formula)
-            content_recs['weighted_rating'] = (
-                (vote_counts / (vote_counts + mean_votes)) * vote_averages + 
-                (mean_votes / (vote_counts + mean_votes)) * mean_rating
-            )
+            # Alternative popularity metric: the weighted rating precomputed over the whole catalog
+            weighted_rating = content_recs['id'].map(self._wr_by_id).to_numpy(dtype=np.float64, na_value=np.nan)
             
             # Normalize weighted rating
-            max_rating = content_recs['weighted_rating'].max()
+            max_rating = self._wr_max
             if max_rating > 0:
-                content_recs['weighted_rating_norm'] = content_recs['weighted_rating'] / max_rating
+                weighted_rating_norm = weighted_rating / max_rating
             else:
-                content_recs['weighted_rating_norm'] = 0
-                
+                weighted_rating_norm = np.zeros_like(weighted_rating)
+            # Private name, so a persisted weighted_rating column is never overwritten
+            content_recs['_weighted_rating'] = weighted_rating
+            content_recs['weighted_rating_norm'] = weighted_rating_norm
+            
             # Calculate hybrid score
-            content_recs['hybrid_score'] = (
-                weight_content * content_recs['similarity_score'] + 
-                weight_popularity * content_recs['weighted_rating_norm']
-            )
+            hybrid_score = weight_content * similarity + weight_popularity * weighted_rating_norm
         else:
             # If no popularity metrics, just use content-based
-            content_recs['hybrid_score'] = content_recs['similarity_score']
+            hybrid_score = similarity
+        content_recs['hybrid_score'] = hybrid_score
             
-        # Sort by hybrid score and return top N
-        return content_recs.sort_values('hybrid_score', ascending=False).head(n)
+        # Return the top N by hybrid score
+        return top_n(content_recs, 'hybrid_score', n)
     
     def get_recommendations_for_user(self, favorite_movies, favorite_genres=None, n=10):
         """Get personalized recommendations based on user's favorite movies and genres"""
@@ -195,41 +332,39 @@ class MovieRecommender:
         if not favorite_movies and (not favorite_genres or len(favorite_genres) == 0):
             return self.get_popularity_based_recommendations(n=n)
             
-        # Start with an empty dataframe for recommendations
-        all_recommendations = pd.DataFrame()
+        # Collect the recommendation frames and concatenate them once at the end
+        frames = []
         
-        # Get content-based recommendations for each favorite movie
-        for movie in favorite_movies:
-            try:
-                movie_recs = self.get_content_based_recommendations(movie, n=n)
-                all_recommendations = pd.concat([all_recommendations, movie_recs])
-            except ValueError:
-                # Skip if movie not found
-                continue
-                
+        # Get content-based recommendations for all favorite movies at once, skipping unknown titles
+        favorite_idx = [idx for idx in map(self._resolve_title, favorite_movies or []) if idx is not None]
+        if favorite_idx and self.feature_matrix is not None:
+            frames.append(self._recommend_for_favorites(favorite_idx, n))
+            
         # If favorite genres provided, add genre-based recommendations
         if favorite_genres and len(favorite_genres) > 0:
             for genre in favorite_genres:
                 try:
-                    genre_recs = self.get_genre_based_recommendations(genre, n=n)
-                    all_recommendations = pd.concat([all_recommendations, genre_recs])
+                    frames.append(self.get_genre_based_recommendations(genre, n=n))
                 except ValueError:
                     # Skip if genre not found
                     continue
                     
+        all_recommendations = pd.concat(frames) if frames else pd.DataFrame()
+        
         # If no recommendations found, return popularity-based
         if len(all_recommendations) == 0:
             return self.get_popularity_based_recommendations(n=n)
             
-        # Remove duplicates and favorite movies from recommendations
+        # Remove duplicates and favorite movies from recommendations, comparing ids rather than titles
         all_recommendations = all_recommendations.drop_duplicates(subset=['id'])
-        all_recommendations = all_recommendations[~all_recommendations['title'].isin(favorite_movies)]
+        favorite_ids = set(self.movies_df['id'].iloc[favorite_idx])
+        all_recommendations = all_recommendations[~all_recommendations['id'].isin(favorite_ids)]
         
-        # Sort by combined score (if available) or vote average
+        # Take the top N by combined score (if available) or vote average
         if 'similarity_score' in all_recommendations.columns:
-            all_recommendations = all_recommendations.sort_values('similarity_score', ascending=False)
+            return top_n(all_recommendations, 'similarity_score', n)
         elif 'vote_average' in all_recommendations.columns:
-            all_recommendations = all_recommendations.sort_values('vote_average', ascending=False)
+            return top_n(all_recommendations, 'vote_average', n)
             
         return all_recommendations.head(n)
     
@@ -248,7 +383,7 @@ class MovieRecommender:
             year_threshold = int(self.movies_df['year'].median())
             
         # Filter recent movies
-        recent_movies = self.movies_df[self.movies_df['year'] >= year_threshold]
+        recent_movies = self.movies_df[(self.movies_df['year'] >= year_threshold).fillna(False).astype(bool)]
         
         # If no recent movies found, return some popular ones
         if len(recent_movies) == 0:
@@ -256,7 +391,7 @@ class MovieRecommender:
             
         # Sort by popularity or vote average
         if 'popularity' in recent_movies.columns:
-            return recent_movies.sort_values('popularity', ascending=False).head(n)
+            return top_n(recent_movies, 'popularity', n)
         elif 'vote_average' in recent_movies.columns and 'vote_count' in recent_movies.columns:
             # Only consider movies with a minimum number of votes
             vote_threshold = recent_movies['vote_count'].quantile(0.3)  # Lower threshold for recent movies
@@ -266,7 +401,7 @@ class MovieRecommender:
             if len(qualified) < n:
                 qualified = recent_movies
                 
-            return qualified.sort_values('vote_average', ascending=False).head(n)
+            return top_n(qualified, 'vote_average', n)
         else:
             # Return random selection if no popularity metrics
             return recent_movies.sample(min(n, len(recent_movies)))
@@ -3,9 +3,71 @@ import pandas as pd
 import os
 import time
 import json
+import ast
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from PIL import Image
 from io import BytesIO
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Shared HTTP session so TMDB API calls and image downloads reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+def get_tmdb_api_key():
+    """
+    Get the TMDB API key from Streamlit secrets
+    
+    Returns:
+        str: API key, or an empty string if none is configured
+    """
+    try:
+        return st.secrets.get("TMDB_API_KEY", "")
+    except FileNotFoundError:
+        # No secrets file at all
+        return ""
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _fetch_movie_details(movie_id, api_key):
+    """
+    Fetch the image paths of a movie from the TMDB details endpoint, caching them across reruns
+    
+    Args:
+        movie_id (int): TMDB movie ID
+        api_key (str): TMDB API key
+        
+    Only definitive answers are cached: a 404 returns None, while timeouts,
+    connection errors and other error responses raise so the next call retries.
+    
+    Returns:
+        dict: poster_path and backdrop_path, or None if TMDB has no such movie
+        
+    Raises:
+        requests.RequestException: If the request failed
+    """
+    response = _SESSION.get(
+        f"https://api.themoviedb.org/3/movie/{movie_id}",
+        params={"api_key": api_key},
+        timeout=5
+    )
+    
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    
+    data = response.json()
+    return {
+        "poster_path": data.get("poster_path"),
+        "backdrop_path": data.get("backdrop_path")
+    }
 
 def get_poster_url(movie_id, base_url="https://image.tmdb.org/t/p/w500", api_key=None):
     """
@@ -20,27 +82,19 @@ def get_poster_url(movie_id, base_url="https://image.tmdb.org/t/p/w500", api_key
         str: Full poster URL or None if not found
     """
     if not api_key:
-        api_key = st.secrets.get("TMDB_API_KEY", "")
+        api_key = get_tmdb_api_key()
         if not api_key:
             return None
             
+    # Poster and backdrop share one cached details request; failures aren't cached
     try:
-        # Make API request to get movie details
-        response = requests.get(
-            f"https://api.themoviedb.org/3/movie/{movie_id}",
-            params={"api_key": api_key}
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("poster_path"):
-                return f"{base_url}{data['poster_path']}"
-            else:
-                return None
-        else:
-            return None
-    except:
+        details = _fetch_movie_details(movie_id, api_key)
+    except requests.RequestException:
         return None
+        
+    if details and details.get("poster_path"):
+        return f"{base_url}{details['poster_path']}"
+    return None
 
 def get_poster_image(poster_url, placeholder_path="movie_recommender/data/placeholder.jpg"):
     """
@@ -51,26 +105,146 @@ def get_poster_image(poster_url, placeholder_path="movie_recommender/data/placeh
         placeholder_path (str): Path to placeholder image
         
     Returns:
-        PIL.Image: Poster image or placeholder
+        PIL.Image: Poster image, or the shared placeholder (don't modify it in place)
     """
     try:
-        if poster_url:
-            response = requests.get(poster_url)
-            if response.status_code == 200:
-                return Image.open(BytesIO(response.content))
+        # The downloaded bytes are cached, so repeated posters skip the network
+        image_bytes = _fetch_image_bytes_or_none(poster_url)
+        if image_bytes:
+            return Image.open(BytesIO(image_bytes))
             
         # If URL is None or request failed, return placeholder
+        return _placeholder_image(placeholder_path)
+    except:
+        return _placeholder_image(placeholder_path)
+
+@lru_cache(maxsize=8)
+def _placeholder_image(placeholder_path):
+    """
+    Load the placeholder poster once per path and share it between callers
+    
+    Args:
+        placeholder_path (str): Path to placeholder image
+        
+    Returns:
+        PIL.Image: Placeholder image, or a plain gray one if the file is missing
+    """
+    try:
         if os.path.exists(placeholder_path):
-            return Image.open(placeholder_path)
-        else:
-            # Create a simple gray placeholder with text
-            img = Image.new('RGB', (500, 750), color=(50, 50, 50))
+            img = Image.open(placeholder_path)
+            img.load()
             return img
     except:
-        # Create a simple gray placeholder
-        img = Image.new('RGB', (500, 750), color=(50, 50, 50))
-        return img
+        pass
+        
+    # Create a simple gray placeholder
+    return Image.new('RGB', (500, 750), color=(50, 50, 50))
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def fetch_image_bytes(url):
+    """
+    Download an image, caching the bytes across reruns
+    
+    Only definitive answers are cached: transient failures (timeouts, connection
+    errors, 429 and 5xx responses) raise, so the next rerun tries again.
+    
+    Args:
+        url (str): URL of the image
+        
+    Returns:
+        bytes: Image content or None if there is no image at url
+        
+    Raises:
+        requests.RequestException: If the download failed
+    """
+    if not url:
+        return None
+        
+    response = _SESSION.get(url, timeout=5)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.content
+
+def _fetch_image_bytes_or_none(url):
+    """
+    Download an image through the cache, treating a failed download as no image
+    
+    Args:
+        url (str): URL of the image
+        
+    Returns:
+        bytes: Image content or None
+    """
+    try:
+        return fetch_image_bytes(url)
+    except requests.RequestException:
+        return None
 
+def map_with_script_run_ctx(func, items, max_workers):
+    """
+    Map a function over items on a thread pool that shares the caller's script run context
+    
+    Worker threads need the context to use st.cache_data, st.secrets and other
+    Streamlit APIs without "missing ScriptRunContext" warnings.
+    
+    Args:
+        func (function): Function to call on each item
+        items (list): Items to process
+        max_workers (int): Number of worker threads
+        
+    Returns:
+        list: Results in the same order as items
+    """
+    ctx = get_script_run_ctx()
+    
+    def run(item):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return func(item)
+        
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(run, items))
+
+def prefetch_images(urls, max_workers=6):
+    """
+    Download several images concurrently
+    
+    Args:
+        urls (list): Image URLs, entries may be None
+        max_workers (int): Number of concurrent downloads
+        
+    Returns:
+        list: Image bytes (or None) in the same order as urls
+    """
+    return map_with_script_run_ctx(_fetch_image_bytes_or_none, urls, max_workers)
+
+def download_file(url, file_path, chunk_size=1 << 20):
+    """
+    Stream a file to disk without reading it through pandas
+    
+    Args:
+        url (str): URL of the file
+        file_path (str): Destination path
+        chunk_size (int): Bytes written per chunk
+        
+    Returns:
+        str: Destination path
+    """
+    # Write to a temporary file so a failed download never leaves a truncated file behind
+    partial_path = file_path + '.part'
+    try:
+        with _SESSION.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            with open(partial_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+        os.replace(partial_path, file_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return file_path
+
+@lru_cache(maxsize=4096)
 def format_genres(genres_str):
     """
     Format genres string for display
@@ -84,18 +258,70 @@ def format_genres(genres_str):
     if not genres_str or pd.isna(genres_str):
         return "Unknown"
         
-    # Try to parse JSON if in JSON format
+    # Try to parse JSON or a Python list literal
     try:
-        genres = json.loads(genres_str.replace("'", "\""))
+        genres = _load_genres(genres_str)
         if isinstance(genres, list):
-            genre_names = [g.get('name', '') for g in genres if 'name' in g]
-            return ", ".join(genre_names)
+            return ", ".join(_genre_list_names(genres))
     except:
         pass
         
-    # If not JSON, just clean the string
+    # If not a list, just clean the string
     return genres_str.replace("[", "").replace("]", "").replace("'", "").replace("\"", "")
 
+def parse_genre_names(genres_str):
+    """
+    Parse a genres value into a list of genre names
+    
+    Args:
+        genres_str (str): JSON or Python list of genre objects, or comma-separated genres
+        
+    Returns:
+        list: Genre names in their original order
+    """
+    if not isinstance(genres_str, str) or not genres_str:
+        return []
+        
+    try:
+        genres = _load_genres(genres_str)
+    except:
+        # If not a list literal, try simple string splitting
+        return [g.strip() for g in genres_str.split(',')]
+        
+    if isinstance(genres, list):
+        return _genre_list_names(genres)
+    return []
+
+def _load_genres(genres_str):
+    """
+    Load a genres string written as JSON or as a Python literal
+    
+    Args:
+        genres_str (str): String with genres
+        
+    Returns:
+        object: Parsed value
+    """
+    # TMDB exports are JSON; older dumps use Python reprs with single quotes,
+    # which literal_eval handles without breaking on names like "Bill's"
+    try:
+        return json.loads(genres_str)
+    except ValueError:
+        return ast.literal_eval(genres_str)
+
+def _genre_list_names(genres):
+    """
+    Get the names from a parsed list of genre objects or genre strings
+    
+    Args:
+        genres (list): Parsed genres
+        
+    Returns:
+        list: Genre names
+    """
+    return [g['name'] if isinstance(g, dict) else str(g) for g in genres
+            if not isinstance(g, dict) or 'name' in g]
+
 def create_star_rating(rating, max_rating=10, filled_char="★", empty_char="☆"):
     """
     Create a star rating visualization
@@ -118,14 +344,36 @@ def create_star_rating(rating, max_rating=10, filled_char="★", empty_char="☆
         max_rating = 5
         
     # Round to nearest half star
-    rating_rounded = round(rating * 2) / 2
+    half_stars = round(rating * 2)
     
-    # Create star string
-    filled_stars = filled_char * int(rating_rounded)
-    half_star = "½" if rating_rounded % 1 == 0.5 else ""
-    empty_stars = empty_char * int(max_rating - rating_rounded)
+    # Default 5-star strings come from the lookup table, anything else is built
+    if max_rating == 5 and filled_char == "★" and empty_char == "☆" and 0 <= half_stars <= 10:
+        stars = _STAR_LUT[half_stars]
+    else:
+        stars = _build_stars(half_stars, max_rating, filled_char, empty_char)
     
-    return f"{filled_stars}{half_star}{empty_stars} ({rating:.1f}/10)"
+    return f"{stars} ({rating:.1f}/10)"
+
+def _build_stars(half_stars, max_rating, filled_char, empty_char):
+    """
+    Build the star string for a rating given in half stars
+    
+    Args:
+        half_stars (int): Rating rounded to a whole number of half stars
+        max_rating (int): Number of stars in the scale
+        filled_char (str): Character for filled stars
+        empty_char (str): Character for empty stars
+        
+    Returns:
+        str: Star string
+    """
+    filled_stars = filled_char * (half_stars // 2)
+    half_star = "½" if half_stars % 2 == 1 else ""
+    empty_stars = empty_char * int(max_rating - half_stars / 2)
+    return f"{filled_stars}{half_star}{empty_stars}"
+
+# Star strings for 0 to 5 stars in half-star steps
+_STAR_LUT = [_build_stars(half_stars, 5, "★", "☆") for half_stars in range(11)]
 
 def get_movie_backdrop(movie_id, api_key=None, base_url="https://image.tmdb.org/t/p/w1280"):
     """
@@ -140,27 +388,19 @@ def get_movie_backdrop(movie_id, api_key=None, base_url="https://image.tmdb.org/
         str: Backdrop image URL or None if not found
     """
     if not api_key:
-        api_key = st.secrets.get("TMDB_API_KEY", "")
+        api_key = get_tmdb_api_key()
         if not api_key:
             return None
             
+    # Poster and backdrop share one cached details request; failures aren't cached
     try:
-        # Make API request to get movie details
-        response = requests.get(
-            f"https://api.themoviedb.org/3/movie/{movie_id}",
-            params={"api_key": api_key}
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("backdrop_path"):
-                return f"{base_url}{data['backdrop_path']}"
-            else:
-                return None
-        else:
-            return None
-    except:
+        details = _fetch_movie_details(movie_id, api_key)
+    except requests.RequestException:
         return None
+        
+    if details and details.get("backdrop_path"):
+        return f"{base_url}{details['backdrop_path']}"
+    return None
 
 def create_movie_card(movie, show_poster=True, show_rating=True, on_click=None):
     """
@@ -201,8 +441,10 @@ def create_movie_card(movie, show_poster=True, show_rating=True, on_click=None):
             except:
                 pass
         
-        # Show genres if available
-        if 'genres' in movie and not pd.isna(movie['genres']):
+        # Show genres if available, preferring the display string precomputed by load_tmdb_data
+        if '_genres_display' in movie and isinstance(movie['_genres_display'], str):
+            st.write(f"**Genres:** {movie['_genres_display']}")
+        elif 'genres' in movie and not pd.isna(movie['genres']):
             st.write(f"**Genres:** {format_genres(movie['genres'])}")
         
         # Show rating if available and requested
@@ -235,7 +477,7 @@ def export_recommendations(recommendations, format="csv"):
         return recommendations.to_csv(index=False).encode('utf-8')
     elif format == "txt":
         text = "Recommended Movies:\n\n"
-        for i, (_, movie) in enumerate(recommendations.iterrows(), 1):
+        for i, movie in enumerate(recommendations.to_dict('records'), 1):
             text += f"{i}. {movie['title']}"
             if 'year' in movie and not pd.isna(movie['year']):
                 text += f" ({int(movie['year'])})"
@@ -246,9 +488,25 @@ def export_recommendations(recommendations, format="csv"):
     else:
         raise ValueError(f"Unsupported format: {format}")
 
+# Columns of a TMDB export that the cards and helpers read, with the text ones parsed as strings
+TMDB_COLUMNS = [
+    'id', 'movie_id', 'title', 'overview', 'genres', 'release_date', 'poster_path',
+    'backdrop_path', 'popularity', 'vote_average', 'vote_count', 'rating'
+]
+
+TMDB_DTYPES = {
+    'title': 'string',
+    'overview': 'string',
+    'genres': 'string',
+    'release_date': 'string',
+    'poster_path': 'string',
+    'backdrop_path': 'string'
+}
+
+@st.cache_data(show_spinner="Loading catalog...")
 def load_tmdb_data(file_path):
     """
-    Load and process TMDB dataset
+    Load and process TMDB dataset, caching the result across reruns
     
     Args:
         file_path (str): Path to the TMDB CSV file
@@ -256,12 +514,22 @@ def load_tmdb_data(file_path):
     Returns:
         pd.DataFrame: Processed dataframe
     """
-    # Load data
-    df = pd.read_csv(file_path)
+    # Load only the columns we use; fall back to every column if none are recognized
+    header = pd.read_csv(file_path, nrows=0).columns
+    usecols = [col for col in header if col in TMDB_COLUMNS] or None
+    dtype = {col: col_type for col, col_type in TMDB_DTYPES.items() if usecols and col in usecols}
+    df = pd.read_csv(file_path, usecols=usecols, dtype=dtype, low_memory=False)
     
-    # Extract year from release_date
+    # Extract year from release_date; TMDB dates are YYYY-MM-DD, so only the prefix is parsed
     if 'release_date' in df.columns:
-        df['year'] = pd.to_datetime(df['release_date'], errors='coerce').dt.year
+        year = df['release_date'].astype('string').str.slice(0, 4)
+        df['year'] = pd.to_numeric(year, errors='coerce').astype('Int16')
+    
+    # Genre lists repeat across many movies, so store each distinct string once and
+    # format genres per category rather than per card render
+    if 'genres' in df.columns:
+        df['genres'] = df['genres'].astype('category')
+        df['_genres_display'] = df['genres'].map(format_genres)
     
     # Ensure id column is present
     if 'id' not in df.columns and 'movie_id' in df.columns: